@@ -1,13 +1,145 @@
+import os
 import re
 import numpy as np
 import pandas as pd
 
-from pandas.api.types import is_string_dtype, is_numeric_dtype, is_categorical_dtype
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
 
 
-def convert_to_categorical(data_frame, ordinal_categorical_features = None, drop_features = None, skip_features = None):
+_ENGINE = os.environ.get('STRUCTURED_ENGINE', 'pandas')
+
+_FACTORIZE_RUNS_MIN_ROWS = 1_000_000
+
+_DATE_SUFFIX_RE = re.compile('[Dd]ate$')
+
+_DATE_ATTRS = ('year', 'month', 'week', 'day', 
+               'dayofweek', 'dayofyear', 'is_month_end', 'is_month_start', 
+               'is_quarter_end', 'is_quarter_start', 'is_year_end', 'is_year_start')
+
+_TIME_ATTRS = ('hour', 'minute', 'second')
+
+_DATE_ATTR_DTYPES = {'year': 'uint16', 'month': 'uint8', 'week': 'uint8', 'day': 'uint8', 'dayofweek': 'uint8', 'dayofyear': 'uint16', 
+                     'hour': 'uint8', 'minute': 'uint8', 'second': 'uint8'}
+
+
+def _fast_to_category(series):
+    """
+    Converts an object series to categorical values with a single sorted factorize, building the categorical directly from the codes.
+    This skips the category inference and validation astype('category') performs on top of the same factorization.
+    Falls back to astype('category') for non-object series.
+    """
+    if series.dtype != object:
+        return series.astype('category')
+    
+    codes, categories = pd.factorize(series, sort = True)
+    
+    return pd.Series(pd.Categorical.from_codes(codes, dtype = pd.CategoricalDtype(categories.to_numpy())), index = series.index, name = series.name)
+
+
+def _arrow_to_category(series):
+    """
+    Converts an Arrow-backed string series to categorical values with the pyarrow dictionary_encode kernel, 
+    which hashes the UTF-8 buffers directly instead of boxing every value.
+    The dictionary is sorted afterwards so that the categories match astype('category').
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    values = pa.array(series)
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+        
+    encoded = pc.dictionary_encode(values)
+    order   = pc.array_sort_indices(encoded.dictionary).to_numpy()
+    
+    # the trailing -1 is picked up by missing values, which are filled with index -1
+    ranks = np.empty(len(order) + 1, dtype = np.int32)
+    ranks[order] = np.arange(len(order))
+    ranks[-1] = -1
+    
+    codes      = ranks[pc.fill_null(encoded.indices, -1).to_numpy()]
+    categories = pd.Index(pd.array(encoded.dictionary.take(order), dtype = series.dtype))
+    
+    return pd.Series(pd.Categorical.from_codes(codes, dtype = pd.CategoricalDtype(categories)), index = series.index, name = series.name)
+
+
+def _factorize_runs(series):
+    """
+    Converts an object series to categorical values by factorizing only the first value of each run of repeated values.
+    Sorted or heavily clustered columns have far fewer runs than rows, so most of the per-object hashing is skipped.
+    Falls back to _fast_to_category for non-object series and when more than half of the rows start a new run.
+    """
+    if series.dtype != object:
+        return _fast_to_category(series)
+    
+    # missing values (None, NaN, pd.NA) share one sentinel, pd.NA cannot be compared
+    values = series.to_numpy()
+    values = np.where(pd.isna(values), None, values)
+    heads  = np.flatnonzero(np.concatenate([[True], values[1:] != values[:-1]]))
+    
+    if len(heads) > len(values) // 2:
+        return _fast_to_category(series)
+    
+    runs  = _fast_to_category(series.iloc[heads])
+    codes = np.repeat(runs.cat.codes.to_numpy(), np.diff(np.append(heads, len(values))))
+    
+    return pd.Series(pd.Categorical.from_codes(codes, dtype = runs.dtype), index = series.index, name = series.name)
+
+
+def _fast_median(values, mask):
+    """
+    Computes the median of the values that are not masked with a single np.partition (introselect) pass.
+    Returns NaN when every value is masked.
+    """
+    clean = values[~mask]
+    k     = clean.size // 2
+    
+    if clean.size == 0:
+        return np.nan
+    
+    if clean.size % 2:
+        return np.partition(clean, k)[k]
+    
+    partitioned = np.partition(clean, [k - 1, k])
+    
+    return 0.5 * (partitioned[k - 1] + partitioned[k])
+
+
+@lru_cache(maxsize = None)
+def _date_attr_spec(time, downcast, arrow):
+    """
+    Returns the date attributes to extract and the dtype each one is cast to (None keeps the pandas dtype).
+    Cached, so every (time, downcast, arrow) combination is only resolved once.
+    """
+    attrs  = _DATE_ATTRS + _TIME_ATTRS if time else _DATE_ATTRS
+    dtypes = []
+    
+    for attr in attrs:
+        if not downcast or attr not in _DATE_ATTR_DTYPES:
+            dtypes.append(None)
+        elif arrow:
+            dtypes.append(f'{_DATE_ATTR_DTYPES[attr]}[pyarrow]')
+        else:
+            dtypes.append(_DATE_ATTR_DTYPES[attr])
+            
+    return attrs, tuple(dtypes)
+
+
+def _extract_date_attr(dt, attr, dtype):
+    """
+    Extracts a single attribute from a datetime accessor and casts it to dtype, unless dtype is None.
     """
-    Converts all string columns in a panda's data frame to a column of categorical values.
+    values = dt.isocalendar().week if attr == 'week' else getattr(dt, attr)
+    
+    return values if dtype is None else values.astype(dtype)
+
+
+def convert_to_categorical(data_frame, ordinal_categorical_features = None, drop_features = None, skip_features = None, engine = None):
+    """
+    Converts all string columns in a panda's data frame to a column of categorical values. The input data frame is not modified, 
+    and it is returned as is when there is nothing to drop or convert.
     
     Parameters:
     -----------
@@ -15,6 +147,7 @@ def convert_to_categorical(data_frame, ordinal_categorical_features = None, drop
     ordinal_categorical : A string or list of strings that represent the name of ordinal categorical features. 
     drop_features       : A string or list of strings that represent the name of features to drop.
     skip_features       : A string or list of strings that represent the name of features to skip during processing.
+    engine              : Either 'pandas' or 'polars' (requires polars), defaults to the STRUCTURED_ENGINE environment variable or 'pandas'.
     
     Examples:
     ---------
@@ -37,8 +170,6 @@ def convert_to_categorical(data_frame, ordinal_categorical_features = None, drop
     --------
     data_frame : The processed data frame.
     """
-    df = data_frame.copy()
-    
     if isinstance(ordinal_categorical_features, str):
         ordinal_categorical_features = [ordinal_categorical_features]
     
@@ -57,24 +188,56 @@ def convert_to_categorical(data_frame, ordinal_categorical_features = None, drop
     if skip_features is None:
         skip_features = []
         
-    df = df.drop(drop_features, axis = 1)
+    # object columns only count as strings when every present value is a string, like is_string_dtype did
+    string_features = [feature for feature, dtype in data_frame.dtypes.items() 
+                       if feature not in drop_features and feature not in skip_features and 
+                       (isinstance(dtype, pd.StringDtype) or (dtype == object and pd.api.types.infer_dtype(data_frame[feature], skipna = True) == 'string'))]
+    
+    if not drop_features and not string_features:
+        return data_frame
+    
+    df = data_frame.drop(drop_features, axis = 1)
+    
+    if (engine or _ENGINE) == 'polars' and string_features:
+        import polars as pl
+        
+        # polars only accepts string column names, so the columns are passed by position
+        converted = pl.from_pandas(df[string_features].set_axis(range(len(string_features)), axis = 1).rename(columns = str))
+        converted = converted.with_columns(pl.all().cast(pl.Categorical)).to_pandas().set_axis(df.index)
+        # polars orders categories by first appearance, pandas sorts them
+        for i, feature in enumerate(string_features):
+            categorical  = converted[str(i)]
+            df[feature] = categorical.cat.reorder_categories(categorical.cat.categories.sort_values())
+    else:
+        object_features = [feature for feature in string_features if df[feature].dtype == object]
+        arrow_features  = [feature for feature in string_features if isinstance(df[feature].dtype, pd.StringDtype) and df[feature].dtype.storage == 'pyarrow']
+        to_category     = _factorize_runs if len(df) > _FACTORIZE_RUNS_MIN_ROWS else _fast_to_category
+        
+        df = df.astype({feature: 'category' for feature in string_features if feature not in object_features and feature not in arrow_features})
+        for feature in object_features:
+            df[feature] = to_category(df[feature])
+            
+        for feature in arrow_features:
+            df[feature] = _arrow_to_category(df[feature])
     
-    for feature in df.columns:
-        if feature not in skip_features and is_string_dtype(df[feature]):
-            df[feature] = df[feature].astype('category').cat.as_ordered() if feature in ordinal_categorical_features else df[feature].astype('category')
+    for feature in string_features:
+        if feature in ordinal_categorical_features:
+            df[feature] = df[feature].cat.as_ordered()
             
     return df
 
 
-def numericalize_categories(data_frame, max_categories = 0, skip_features = None):
+def numericalize_categories(data_frame, max_categories = 0, skip_features = None, sparse = False, arrow = False):
     """
-    Converts categorical features to numbers. In the process it creates the mapping of categorical variables.
+    Converts categorical features to numbers. In the process it creates the mapping of categorical variables. The input data frame is not modified.
     
     Parameters:
     -----------
     data_frame     : A pandas dataframe.
     skip_features  : A string or list of strings that represent the name of features to skip during processing.
     max_categories : If the feature has more categories than max_num_categories then we convert it to codes, otherwise we one-hot encode it.
+    sparse         : If true one-hot encoded columns are stored as sparse columns (requires scipy).
+    arrow          : If true code-encoded columns are stored as Arrow-backed int32 columns (requires pyarrow).
     
     Examples:
     ---------
@@ -113,7 +276,7 @@ def numericalize_categories(data_frame, max_categories = 0, skip_features = None
     data_frame      : The processed data frame.
     category_mapper : A mapping applied to each categorical variable.
     """
-    df = data_frame.copy()
+    df = data_frame
     category_mapper = dict()
     
     if isinstance(skip_features, str):
@@ -122,28 +285,76 @@ def numericalize_categories(data_frame, max_categories = 0, skip_features = None
     if skip_features is None:
         skip_features = []
         
-    for feature in df.columns:
-        if feature not in skip_features and is_categorical_dtype(df[feature]):
+    one_hot_features = []
+    code_features    = dict()
+    
+    for feature, dtype in df.dtypes.items():
+        if feature not in skip_features and isinstance(dtype, pd.CategoricalDtype):
             if (len(df[feature].cat.categories) > max_categories):
                 category_mapper[feature] = dict(enumerate(df[feature].cat.categories))
-                df[feature] = df[feature].cat.codes + 1
+                # codes run from 0 (missing) to the number of categories, a signed dtype keeps codes - 1 at -1 for missing values
+                n_categories = len(df[feature].cat.categories)
+                code_dtype   = next(dtype for dtype in (np.int8, np.int16, np.int32, np.int64) if np.iinfo(dtype).max >= n_categories)
+                code_features[feature] = (df[feature].cat.codes + 1).astype(code_dtype)
             else:
-                one_hot = pd.get_dummies(df[feature], prefix = f'{feature}')
-                df = df.drop(feature, axis = 1)
-                df = df.join(one_hot)
+                one_hot_features.append(feature)
                 category_mapper[feature] = 'one-hot'
                 
+    one_hot_frames = []
+    
+    for feature in one_hot_features:
+        categories = df[feature].cat.categories
+        codes      = df[feature].cat.codes.to_numpy()
+        columns    = [f'{feature}_{category}' for category in categories]
+        
+        if sparse:
+            from scipy.sparse import csr_matrix
+            
+            # rows with missing values (code -1) get no stored entry
+            present = codes >= 0
+            indptr  = np.concatenate([[0], np.cumsum(present)])
+            one_hot = csr_matrix((np.ones(present.sum(), dtype = np.uint8), codes[present].astype(np.int32), indptr), shape = (len(codes), len(categories)))
+            one_hot_frames.append(pd.DataFrame.sparse.from_spmatrix(one_hot, index = df.index, columns = columns))
+        else:
+            # the extra all-zero row of the identity matrix is picked up by missing values (code -1)
+            one_hot = np.eye(len(categories) + 1, len(categories), dtype = np.uint8)[codes]
+            one_hot_frames.append(pd.DataFrame(one_hot, columns = columns, index = df.index))
+        
+    if arrow and code_features:
+        import pyarrow as pa
+        
+        code_features = {feature: codes.astype(pd.ArrowDtype(pa.int32())) for feature, codes in code_features.items()}
+        
+    if one_hot_features:
+        df = df.drop(one_hot_features, axis = 1)
+        
+    if code_features:
+        df = df.copy(deep = False)
+        for feature, codes in code_features.items():
+            df[feature] = codes
+    
+    # every one-hot frame shares df.index, so concat attaches them without any index alignment
+    if one_hot_frames:
+        one_hot_columns = pd.Index([column for one_hot in one_hot_frames for column in one_hot.columns])
+        overlap         = one_hot_columns[one_hot_columns.duplicated() | one_hot_columns.isin(df.columns)]
+        if len(overlap) > 0:
+            raise ValueError(f'columns overlap but no suffix specified: {overlap.unique()}')
+        
+        df = pd.concat([df] + one_hot_frames, axis = 1)
+                
     return df, category_mapper
 
 
-def interpolate_missing_values(data_frame, skip_features = None):
+def interpolate_missing_values(data_frame, skip_features = None, engine = None, arrow = False):
     """
-    Fill missing numeric data of a feature in a data frame with the median, and add a {feature}_missing column which specifies if the data was missing.
+    Fill missing numeric data of a feature in a data frame with the median, and add a {feature}_missing column which specifies if the data was missing. The input data frame is not modified.
     
     Parameters:
     -----------
     data_frame    : A pandas dataframe.
     skip_features : A string or list of strings that represent the name of features to skip during processing.
+    engine        : Either 'pandas' or 'polars' (requires polars), defaults to the STRUCTURED_ENGINE environment variable or 'pandas'.
+    arrow         : If true {feature}_missing columns are stored as Arrow-backed boolean columns (requires pyarrow).
     
     Examples:
     ---------
@@ -164,8 +375,9 @@ def interpolate_missing_values(data_frame, skip_features = None):
     data_frame     : The processed data frame.
     numeric_mapper : A mapping applied to each numeric variable.
     """
-    df = data_frame.copy()
-    numeric_mapper = dict()
+    numeric_mapper   = dict()
+    filled_features  = dict()
+    missing_features = dict()
     
     if isinstance(skip_features, str):
         skip_features = [skip_features]
@@ -173,18 +385,56 @@ def interpolate_missing_values(data_frame, skip_features = None):
     if skip_features is None:
         skip_features = []
     
-    for feature in df.columns:
-        if feature not in skip_features and is_numeric_dtype(df[feature]):
-            df[f'{feature}_missing'] = df[feature].isnull()
-            df[feature] = df[feature].fillna(value = df[feature].median())
-            numeric_mapper[feature] = df[feature].median()
+    numeric_features = [feature for feature, dtype in data_frame.dtypes.items() if feature not in skip_features and dtype.kind in 'biuf']
+    
+    if (engine or _ENGINE) == 'polars' and numeric_features:
+        import polars as pl
+        
+        # polars only accepts string column names, so the columns are passed by position
+        pl_df   = pl.from_pandas(data_frame[numeric_features].set_axis(range(len(numeric_features)), axis = 1).rename(columns = str), nan_to_null = True).cast(pl.Float64)
+        medians = pl_df.select(pl.all().median()).row(0)
+        missing = pl_df.select(pl.all().is_null())
+        filled  = pl_df.select([pl.col(column).fill_null(pl.col(column).median()) for column in pl_df.columns])
+        
+        for column, feature, median, null_count in zip(pl_df.columns, numeric_features, medians, pl_df.null_count().row(0)):
+            missing_features[f'{feature}_missing'] = missing[column].to_numpy()
+            if null_count > 0:
+                filled_features[feature] = filled[column].to_numpy()
+            numeric_mapper[feature] = np.float64(median)
+    elif numeric_features:
+        values  = data_frame[numeric_features].to_numpy(dtype = np.float64, na_value = np.nan, copy = True)
+        mask    = np.isnan(values)
+        medians = np.array([_fast_median(values[:, i], mask[:, i]) for i in range(len(numeric_features))])
+        np.copyto(values, np.broadcast_to(medians, values.shape), where = mask)
+        
+        for i, (feature, median) in enumerate(zip(numeric_features, medians)):
+            missing_features[f'{feature}_missing'] = mask[:, i]
+            if mask[:, i].any():
+                filled_features[feature] = values[:, i]
+            numeric_mapper[feature] = median
+            
+    if arrow and missing_features:
+        import pyarrow as pa
+        
+        missing_features = {feature: pd.array(mask, dtype = pd.ArrowDtype(pa.bool_())) for feature, mask in missing_features.items()}
+            
+    df = data_frame.copy(deep = False)
+    
+    # float columns keep their dtype (e.g. float32), the fill itself is computed in float64
+    for feature, values in filled_features.items():
+        dtype       = data_frame[feature].dtype
+        df[feature] = pd.Series(values, index = df.index, dtype = dtype) if dtype.kind == 'f' else values
+    
+    if missing_features:
+        df = df.drop(columns = list(missing_features), errors = 'ignore')
+        df = pd.concat([df, pd.DataFrame(missing_features, index = df.index)], axis = 1)
             
     return df, numeric_mapper
 
 
-def extract_date_features(data_frame, date_features, time = False, drop = True):
+def extract_date_features(data_frame, date_features, time = False, drop = True, arrow = False):
     """
-    Converts a column(s) of a data frame from a datetime64 to many columns containing the information from the date feature.
+    Converts a column(s) of a data frame from a datetime64 to many columns containing the information from the date feature. The input data frame is not modified.
     
     Parameters:
     -----------
@@ -192,6 +442,7 @@ def extract_date_features(data_frame, date_features, time = False, drop = True):
     data_features : A string or list of strings that represent the name of the date column you wish to extract features from. If it is not a datetime64 series, it will be converted to one.
     time          : If true time features: hour, minute, second will be included.
     drop          : If true then the original date column will be removed.
+    arrow         : If true the extracted columns are stored as Arrow-backed columns (requires pyarrow).
     
     Examples:
     ---------
@@ -212,34 +463,43 @@ def extract_date_features(data_frame, date_features, time = False, drop = True):
     --------
     data_frame : A data frame with extracted features from date column(s).
     """
-    df = data_frame.copy()
-
-    attrs = ['year', 'month', 'week', 'day', 
-            'dayofweek', 'dayofyear', 'is_month_end', 'is_month_start', 
-            'is_quarter_end', 'is_quarter_start', 'is_year_end', 'is_year_start']
-    
-    if time:
-        attrs = attrs + ['hour', 'minute', 'second']
+    df = data_frame
         
     if isinstance(date_features, str):
         date_features = [date_features]
+        
+    date_features = list(dict.fromkeys(date_features))
 
     for feature in date_features:
-        column       = df[feature]
-        column_dtype = df[feature].dtype 
+        column = df[feature]
         
-        if isinstance(column.dtype, pd.core.dtypes.dtypes.DatetimeTZDtype):
-            column_dtype = np.datetime64
-            
-        if not np.issubdtype(column_dtype, np.datetime64):
-            df[feature] = df[feature].astype(np.datetime64)
-            
-        name = re.sub('[Dd]ate$', '', feature)       
-            
-        for attr in attrs:
-            df[f'{name}_{attr}'] = getattr(df[feature].dt, attr)
+        if not (column.dtype.kind == 'M' or isinstance(column.dtype, pd.DatetimeTZDtype)):
+            column = pd.to_datetime(column, cache = True)
             
+        dt   = column.dt
+        name = _DATE_SUFFIX_RE.sub('', feature)
+        
+        # arrow integers are nullable, so they can be downcast even when some dates are missing
+        downcast      = bool(arrow) or not column.isna().any()
+        attrs, dtypes = _date_attr_spec(bool(time), downcast, bool(arrow))
+        
+        # the datetime field kernels release the GIL, the pool is local to the call so it is never shared across a fork
+        with ThreadPoolExecutor(max_workers = min(len(attrs), os.cpu_count() or 1)) as executor:
+            parts = list(executor.map(_extract_date_attr, repeat(dt), attrs, dtypes))
+                
+        parts = pd.DataFrame(dict(zip([f'{name}_{attr}' for attr in attrs], parts)), index = df.index)
+        
+        if arrow:
+            parts = parts.convert_dtypes(dtype_backend = 'pyarrow')
+                
+        # extracted columns replace any existing ones with the same name instead of duplicating them
+        df = df.drop(columns = parts.columns, errors = 'ignore')
+        
         if drop:
             df = df.drop(feature, axis = 1)
+        else:
+            df[feature] = column
+            
+        df = pd.concat([df, parts], axis = 1)
     
     return df
\ No newline at end of file